@@ -0,0 +1,30 @@
+"""
+🔧 Ahead-of-time build of the CPM kernels
+
+Compiles the fused kernel and the row-order solver from cpm_kernels.py into
+the extension module cpm_kernels_aot, so that running cpm.py neither imports
+Numba nor pays its JIT compilation on every invocation. Requires numba at
+build time only.
+
+Usage: python build_kernels.py
+"""
+
+import sys
+
+from numba.pycc import CC
+
+# Compile from the Numba kernels, even if an older AOT build is importable
+sys.modules['cpm_kernels_aot'] = None
+import cpm_kernels
+
+cc = CC('cpm_kernels_aot')
+
+# One export per schedule dtype chosen by cpm.scheduleDtype
+for suffix in ('i2', 'i4'):
+    signature = f'Tuple(({suffix}[:, :], {suffix}[:]))({suffix}[:], i4[:], i4[:], i4[:], i4[:])'
+    cc.export(f'compute_all_{suffix}', signature)(cpm_kernels.compute_all.py_func)
+
+cc.export('solve_rows', 'Tuple((i4[:, :], i4[:]))(i4[:], i4[:], i4[:], i4[:], i4[:], i4[:])')(cpm_kernels.solve_rows.py_func)
+
+if __name__ == "__main__":
+    cc.compile()
@@ -15,132 +15,237 @@ in the context of optimizing the production of seamless steel tubes.
 import pandas as pd
 import numpy as np
 
+import cpm_batch
+import cpm_kernels
+
 # Print stars for section formatting
 def stars(number):
     print("*" * number)
 
+# Raised when the input tasks are invalid
+class CPMError(ValueError):
+    pass
+
 # Error message when a task code is not found
 def errorCodeMsg(code):
-    print(f"Error in input file : CODE - Code '{code}' not found")
-    quit()
+    raise CPMError(f"Error in input file : CODE - Code '{code}' not found")
 
 # Error message when an invalid predecessor is found
 def errorPredMsg(pred):
-    print(f"Error in input file : PREDECESSORS - Invalid predecessor '{pred}'")
-    quit()
+    raise CPMError(f"Error in input file : PREDECESSORS - Invalid predecessor '{pred}'")
 
 # Error message for duration issues
 def errorDurMsg():
-    print("Error in input file : DURATION ")
-    quit()
+    raise CPMError("Error in input file : DURATION ")
 
-# Get index of task by its code
-def getTaskIndex(mydata, code):
-    if pd.isna(code) or code == '':
-        return None
-    try:
-        return mydata.index[mydata['COD'] == code.strip()][0]
-    except IndexError:
-        errorCodeMsg(code)
+# Error message when a task code appears more than once
+def errorDupCodeMsg(code):
+    raise CPMError(f"Error in input file : CODE - Duplicate code '{code}'")
+
+# Error message when the predecessors form a cycle
+def errorCycleMsg():
+    raise CPMError("Error in input file : PREDECESSORS - Cycle detected")
+
+# Parse the predecessor column once into lists of task indices
+def parsePredecessors(mydata, code_to_idx):
+    pre_series = mydata['PRE'].fillna('').astype(str).str.strip()
+    # Only tasks with predecessors need their PRE string split
+    has_preds = (pre_series != '').to_numpy()
+    PRE = [[] for _ in range(len(pre_series))]
+    for i, codes in zip(np.flatnonzero(has_preds), pre_series[has_preds].str.split(',')):
+        for pred in codes:
+            pred = pred.strip()
+            if not pred:
+                continue
+            pred_idx = code_to_idx.get(pred)
+            if pred_idx is None:
+                errorCodeMsg(pred)
+            PRE[i].append(pred_idx)
+    return PRE
+
+# Pack lists of task indices into CSR arrays (indptr, idx)
+def buildCSR(lists):
+    indptr = np.zeros(len(lists) + 1, dtype=np.int32)
+    indptr[1:] = np.cumsum([len(l) for l in lists])
+    idx = np.fromiter((j for l in lists for j in l), dtype=np.int32, count=indptr[-1])
+    return indptr, idx
+
+# Reverse every edge of a CSR graph, e.g. successors from predecessors
+# The stable argsort keeps each task's neighbours in ascending order
+def transposeCSR(indptr, idx):
+    n = indptr.size - 1
+    rows = np.repeat(np.arange(n, dtype=np.int32), np.diff(indptr))
+    t_indptr = np.zeros(n + 1, dtype=np.int32)
+    t_indptr[1:] = np.cumsum(np.bincount(idx, minlength=n))
+    return t_indptr, rows[np.argsort(idx, kind='stable')]
+
+# Renumber a CSR graph: new task k is old task order[k], and old task i becomes rank[i]
+def permuteCSR(indptr, idx, order, rank):
+    count = np.diff(indptr)[order]
+    new_indptr = np.zeros(indptr.size, dtype=np.int32)
+    new_indptr[1:] = np.cumsum(count)
+    # Position in idx of every edge, one contiguous segment per renumbered task
+    pos = np.arange(new_indptr[-1]) - np.repeat(new_indptr[:-1] - indptr[order], count)
+    return new_indptr, rank[idx[pos]]
+
+# Order tasks so every predecessor comes before its successors (Kahn's algorithm)
+# Tasks are grouped into layers: order[layers[k]:layers[k + 1]] only depend on earlier layers
+def topologicalOrder(pred_csr, succ_csr):
+    # Plain lists: the loop touches one element at a time
+    indeg = np.diff(pred_csr[0]).tolist()
+    succ_indptr, succ_idx = (a.tolist() for a in succ_csr)
+
+    order = []
+    layers = [0]
+    layer = [i for i, d in enumerate(indeg) if d == 0]
+    while layer:
+        order.extend(layer)
+        layers.append(len(order))
+        next_layer = []
+        for u in layer:
+            for v in succ_idx[succ_indptr[u]:succ_indptr[u + 1]]:
+                indeg[v] -= 1
+                if indeg[v] == 0:
+                    next_layer.append(v)
+        layer = next_layer
+    return np.array(order, dtype=np.int32), np.array(layers, dtype=np.int32)
 
 # FORWARD PASS: Calculate Earliest Start (ES) and Earliest Finish (EF)
-def forwardPass(mydata):
-    ntask = mydata.shape[0]
-    ES = np.zeros(ntask, dtype=np.int32)
-    EF = np.zeros(ntask, dtype=np.int32)
-    changed = True
-
-    while changed:
-        changed = False
-        for i in range(ntask):
-            old_es = ES[i]
-            predecessors = mydata['PRE'][i]
-            if pd.isna(predecessors) or predecessors == '':
-                ES[i] = 0
-                EF[i] = mydata['DUR'][i]
-            else:
-                if isinstance(predecessors, str):
-                    predecessors = [p.strip() for p in predecessors.split(',') if p.strip()]
-                elif not isinstance(predecessors, list):
-                    predecessors = [predecessors]
-                max_ef = float('-inf')
-                for pred in predecessors:
-                    pred_idx = getTaskIndex(mydata, pred)
-                    if pred_idx is not None:
-                        max_ef = max(max_ef, EF[pred_idx])
-                ES[i] = max_ef if max_ef != float('-inf') else 0
-                EF[i] = ES[i] + mydata['DUR'][i]
-            if ES[i] != old_es:
-                changed = True
-
-    mydata['ES'] = ES
-    mydata['EF'] = EF
-    return mydata
+def forwardPass(DUR, pred_csr, layers):
+    return cpm_kernels.forward_layered(DUR, *pred_csr, layers)
 
 # BACKWARD PASS: Calculate Latest Start (LS) and Latest Finish (LF)
-def backwardPass(mydata):
-    ntask = mydata.shape[0]
-    LS = np.zeros(ntask, dtype=np.int32)
-    LF = np.zeros(ntask, dtype=np.int32)
-
-    # Build successor list
-    SUC = [[] for _ in range(ntask)]
-    for i in range(ntask):
-        preds = mydata['PRE'][i]
-        if pd.isna(preds) or preds == '':
-            continue
-        preds = [p.strip() for p in preds.split(',') if p.strip()]
-        for pred in preds:
-            pred_idx = getTaskIndex(mydata, pred)
-            if pred_idx is not None:
-                SUC[pred_idx].append(mydata['COD'][i])
-
-    # Initialize terminal tasks (those with no successors)
-    for i in range(ntask):
-        if len(SUC[i]) == 0:
-            LF[i] = mydata['EF'][i]
-            LS[i] = LF[i] - mydata['DUR'][i]
-
-    # Iterative update for other tasks
-    changed = True
-    while changed:
-        changed = False
-        for i in range(ntask - 1, -1, -1):
-            if len(SUC[i]) > 0:
-                min_ls = float('inf')
-                for succ_code in SUC[i]:
-                    succ_idx = getTaskIndex(mydata, succ_code)
-                    if LF[succ_idx] != 0:
-                        min_ls = min(min_ls, LS[succ_idx])
-                if min_ls != float('inf'):
-                    new_lf = min_ls
-                    new_ls = new_lf - mydata['DUR'][i]
-                    if new_lf != LF[i] or new_ls != LS[i]:
-                        LF[i] = new_lf
-                        LS[i] = new_ls
-                        changed = True
-
-    mydata['LS'] = LS
-    mydata['LF'] = LF
-    return mydata
+def backwardPass(DUR, EF, succ_csr):
+    return cpm_kernels.backward(DUR, EF, *succ_csr)
 
 # Calculate slack (LS - ES)
-def slack(mydata):
-    mydata['SLACK'] = mydata['LS'] - mydata['ES']
-    return mydata
+def slack(ES, LS):
+    return LS - ES
 
 # Build the critical path string based on zero-slack activities
 def critical_path_string(mydata):
-    critical_activities = mydata[mydata['SLACK'] == 0]
-    critical_activities = critical_activities.sort_values(by='ES')
-    path = ' -> '.join(critical_activities['COD'].tolist())
+    ES = mydata['ES'].to_numpy()
+    COD = mydata['COD'].to_numpy()
+    mask = (mydata['LS'].to_numpy() - ES) == 0
+    order = np.argsort(ES[mask], kind='stable')
+    path = ' -> '.join(COD[mask][order])
     return path
 
+# Build the task graph: CSR predecessors/successors and topological layers
+# Tasks are renumbered in topological order (task k is row order[k] of mydata),
+# so both passes are a single linear scan
+def buildGraph(mydata):
+    codes = mydata['COD'].str.strip()
+    duplicated = codes[codes.duplicated()]
+    if not duplicated.empty:
+        errorDupCodeMsg(duplicated.iloc[0])
+    code_to_idx = dict(zip(codes, range(len(mydata))))
+    pred_csr = buildCSR(parsePredecessors(mydata, code_to_idx))
+    order, layers = topologicalOrder(pred_csr, transposeCSR(*pred_csr))
+    if order.size < len(mydata):
+        errorCycleMsg()
+
+    # Renumber tasks: task k is the k-th row in topological order
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.size, dtype=order.dtype)
+    pred_csr = permuteCSR(*pred_csr, order, rank)
+    return pred_csr, transposeCSR(*pred_csr), order, layers
+
+# Put results computed in topological order back into the row order of mydata
+def restoreOrder(a, order, axis=0):
+    unsorted = np.empty_like(a)
+    index = [slice(None)] * a.ndim
+    index[axis] = order
+    unsorted[tuple(index)] = a
+    return unsorted
+
+# Smallest integer type that holds every schedule date (bounded by the sum of durations)
+def scheduleDtype(DUR):
+    if DUR.sum() < np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
+# Durations must be non-negative integers whose total fits in int32:
+# both passes start at 0 and use integer max/min. Returns them as int32
+# DUR must have ndim dimensions, the last one holding one duration per task
+def checkDurations(DUR, ntask, ndim=1):
+    DUR = np.asarray(DUR)
+    if DUR.ndim != ndim or DUR.shape[-1] != ntask:
+        errorDurMsg()
+    if DUR.dtype.kind == 'f':
+        if not np.isfinite(DUR).all() or (DUR != np.round(DUR)).any():
+            errorDurMsg()
+    elif DUR.dtype.kind not in 'iu':
+        errorDurMsg()
+    if DUR.size and ((DUR < 0).any() or DUR.sum(axis=-1, dtype=np.float64).max() > np.iinfo(np.int32).max):
+        errorDurMsg()
+    return DUR.astype(np.int32, copy=False)
+
 # Main wrapper function
 def computeCPM(mydata):
-    mydata = forwardPass(mydata)
-    mydata = backwardPass(mydata)
-    mydata = slack(mydata)
+    DUR = checkDurations(mydata['DUR'], len(mydata))
+    pred_csr, succ_csr, order, layers = buildGraph(mydata)
+    DUR = DUR[order]
+    DUR = DUR.astype(scheduleDtype(DUR), copy=False)
+    compute_all = cpm_kernels.fused_kernel(DUR.dtype)
+    if compute_all is not None:
+        # Single compiled kernel for both passes and slack
+        sched, SLACK = compute_all(DUR, *pred_csr, *succ_csr)
+    else:
+        ES, EF = forwardPass(DUR, pred_csr, layers)
+        LS, LF = backwardPass(DUR, EF, succ_csr)
+        sched = np.column_stack((ES, EF, LS, LF))
+        SLACK = slack(ES, LS)
+    # The narrow schedule dtype stays inside the kernels; public columns are int32
+    sched = restoreOrder(sched.astype(np.int32, copy=False), order)
+    SLACK = restoreOrder(SLACK.astype(np.int32, copy=False), order)
+    return mydata.assign(ES=sched[:, 0], EF=sched[:, 1], LS=sched[:, 2], LF=sched[:, 3], SLACK=SLACK)
+
+# Run CPM on several projects in one call, reusing the compiled kernels
+def compute_many(list_of_dataframes):
+    return [computeCPM(mydata) for mydata in list_of_dataframes]
+
+# Run CPM for many duration scenarios of the same project
+# durations has shape (batch, ntask); returns (ES, EF, LS, LF, SLACK) arrays of that shape
+# Columns follow the row order of mydata
+def computeBatch(mydata, durations):
+    durations = checkDurations(durations, len(mydata), ndim=2)
+    pred_csr, succ_csr, order, layers = buildGraph(mydata)
+    durations = durations[:, order]
+    results = cpm_batch.compute_batch(durations, *pred_csr, *succ_csr, layers)
+    return tuple(restoreOrder(a, order, axis=1) for a in results)
+
+# Solver bound to the task graph of mydata (Monte-Carlo / what-if on durations)
+# solve(DUR) takes and returns rows in the order of mydata: (sched, SLACK), sched columns are ES, EF, LS, LF
+def makeSolver(mydata):
+    pred_csr, succ_csr, order, layers = buildGraph(mydata)
+    pred_indptr, pred_idx = pred_csr
+    succ_indptr, succ_idx = succ_csr
+    ntask = len(mydata)
+
+    if cpm_kernels.HAVE_COMPILED:
+        # Reordering happens inside the compiled kernel
+        def solve(DUR):
+            DUR = checkDurations(DUR, ntask)
+            return cpm_kernels.solve_rows(DUR, order, pred_indptr, pred_idx, succ_indptr, succ_idx)
+        return solve
+
+    def solve(DUR):
+        DUR = checkDurations(DUR, ntask)[order]
+        ES, EF = forwardPass(DUR, pred_csr, layers)
+        LS, LF = backwardPass(DUR, EF, succ_csr)
+        return restoreOrder(np.column_stack((ES, EF, LS, LF)), order), restoreOrder(slack(ES, LS), order)
+    return solve
+
+# Read the tasks CSV with explicit column types (pyarrow engine when installed)
+def loadTasks(path):
+    dtype = {'COD': str, 'PRE': str, 'DUR': np.int32}
+    try:
+        mydata = pd.read_csv(path, engine='pyarrow', dtype=dtype)
+    except ImportError:
+        mydata = pd.read_csv(path, engine='c', dtype=dtype)
+    mydata['COD'] = mydata['COD'].str.strip()
+    mydata['PRE'] = mydata['PRE'].str.strip()
     return mydata
 
 # Output formatting
@@ -158,7 +263,7 @@ def printTask(mydata):
 if __name__ == "__main__":
     # Read tasks from CSV file
     try:
-        mydata = pd.read_csv('tasks.csv')
+        mydata = loadTasks('tasks.csv')
     except FileNotFoundError:
         print("Error: 'tasks.csv' not found. Please create a CSV file with columns 'COD', 'PRE', and 'DUR'.")
         quit()
@@ -167,6 +272,10 @@ if __name__ == "__main__":
         quit()
 
     # Run CPM calculation and display results
-    result = computeCPM(mydata)
+    try:
+        result = computeCPM(mydata)
+    except CPMError as e:
+        print(e)
+        quit()
     path = critical_path_string(result)
     printTask(result)
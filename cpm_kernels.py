@@ -0,0 +1,152 @@
+"""
+⚙️ CPM numeric kernels
+
+Forward and backward passes of the Critical Path Method over a task graph
+stored in CSR form: the predecessors of task i are
+pred_idx[pred_indptr[i]:pred_indptr[i + 1]] (and likewise for successors).
+Tasks must be numbered in topological order, so each pass is one linear scan.
+
+compute_all runs both passes and the slack in one compiled kernel. It is
+taken from the ahead-of-time build (cpm_kernels_aot, see build_kernels.py)
+when present, which needs no Numba at run time; otherwise it is JIT-compiled
+with Numba. Without either, forward_layered and backward run as plain
+Python/NumPy with the same results.
+"""
+
+import numpy as np
+
+# The AOT build is self-contained: when it is present, Numba is not imported
+try:
+    import cpm_kernels_aot
+    HAVE_AOT = True
+except ImportError:
+    HAVE_AOT = False
+
+HAVE_NUMBA = False
+if not HAVE_AOT:
+    try:
+        from numba import njit
+        HAVE_NUMBA = True
+    except ImportError:
+        pass
+
+if not HAVE_NUMBA:
+    # Numba not used: keep the kernels as regular Python functions
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Column positions in the (n, 4) schedule block
+ES, EF, LS, LF = 0, 1, 2, 3
+
+# FORWARD PASS without Numba: one vectorized max-reduction per layer of independent tasks
+# Layer k holds tasks layers[k] to layers[k + 1] - 1
+def forward_layered(dur, pred_indptr, pred_idx, layers):
+    n = dur.size
+    ES = np.zeros(n, dur.dtype)
+    EF = np.zeros(n, dur.dtype)
+    for k in range(layers.size - 1):
+        L = np.arange(layers[k], layers[k + 1])
+        start = pred_indptr[L]
+        count = pred_indptr[L + 1] - start
+        total = count.sum()
+        if total > 0:
+            # Gather the EF of every predecessor, one contiguous segment per task
+            seg_start = np.cumsum(count) - count
+            pos = np.arange(total) - np.repeat(seg_start - start, count)
+            EF_preds = EF[pred_idx[pos]]
+            has_preds = count > 0
+            ES[L[has_preds]] = np.maximum.reduceat(EF_preds, seg_start[has_preds])
+        EF[L] = ES[L] + dur[L]
+    return ES, EF
+
+# BACKWARD PASS: LF is the earliest LS among successors, visited in reverse topological order
+@njit(cache=True)
+def backward(dur, EF, succ_indptr, succ_idx):
+    n = dur.size
+    LS = np.zeros(n, dur.dtype)
+    LF = np.zeros(n, dur.dtype)
+    for i in range(n - 1, -1, -1):
+        start = succ_indptr[i]
+        end = succ_indptr[i + 1]
+        if start == end:
+            # Terminal task: finishes at its EF
+            m = EF[i]
+        else:
+            m = LS[succ_idx[start]]
+            for s in range(start + 1, end):
+                if LS[succ_idx[s]] < m:
+                    m = LS[succ_idx[s]]
+        LF[i] = m
+        LS[i] = m - dur[i]
+    return LS, LF
+
+# FORWARD + BACKWARD PASS and slack fused into a single kernel
+# Returns the schedule as one (n, 4) block with columns ES, EF, LS, LF, plus the slack
+@njit(cache=True)
+def compute_all(dur, pred_indptr, pred_idx, succ_indptr, succ_idx):
+    n = dur.size
+    sched = np.zeros((n, 4), dur.dtype)
+    SLACK = np.zeros(n, dur.dtype)
+    for i in range(n):
+        m = 0
+        for k in range(pred_indptr[i], pred_indptr[i + 1]):
+            p = pred_idx[k]
+            if sched[p, EF] > m:
+                m = sched[p, EF]
+        sched[i, ES] = m
+        sched[i, EF] = m + dur[i]
+    for i in range(n - 1, -1, -1):
+        start = succ_indptr[i]
+        end = succ_indptr[i + 1]
+        if start == end:
+            m = sched[i, EF]
+        else:
+            m = sched[succ_idx[start], LS]
+            for s in range(start + 1, end):
+                if sched[succ_idx[s], LS] < m:
+                    m = sched[succ_idx[s], LS]
+        sched[i, LF] = m
+        sched[i, LS] = m - dur[i]
+        SLACK[i] = sched[i, LS] - sched[i, ES]
+    return sched, SLACK
+
+# Solve for int32 durations given in the caller's row order; task k of the graph is row order[k]
+# Returns the schedule in row order
+@njit(cache=True)
+def solve_rows(dur, order, pred_indptr, pred_idx, succ_indptr, succ_idx):
+    n = order.size
+    topo_dur = np.empty(n, dur.dtype)
+    for k in range(n):
+        topo_dur[k] = dur[order[k]]
+    topo_sched, topo_slack = compute_all(topo_dur, pred_indptr, pred_idx, succ_indptr, succ_idx)
+    sched = np.empty_like(topo_sched)
+    SLACK = np.empty_like(topo_slack)
+    for k in range(n):
+        row = order[k]
+        for c in range(4):
+            sched[row, c] = topo_sched[k, c]
+        SLACK[row] = topo_slack[k]
+    return sched, SLACK
+
+# Prefer the ahead-of-time compiled kernels built by build_kernels.py
+if HAVE_AOT:
+    AOT_KERNELS = {
+        np.dtype(np.int16): cpm_kernels_aot.compute_all_i2,
+        np.dtype(np.int32): cpm_kernels_aot.compute_all_i4,
+    }
+    solve_rows = cpm_kernels_aot.solve_rows
+else:
+    AOT_KERNELS = {}
+
+# True when compute_all and solve_rows run as compiled code
+HAVE_COMPILED = HAVE_AOT or HAVE_NUMBA
+
+# Fused kernel for the given schedule dtype, or None when nothing is compiled
+def fused_kernel(dtype):
+    if dtype in AOT_KERNELS:
+        return AOT_KERNELS[dtype]
+    if HAVE_NUMBA:
+        return compute_all
+    return None
@@ -0,0 +1,202 @@
+"""
+🧪 Regression tests for the CPM calculator
+
+Compares computeCPM against a straightforward fixpoint implementation of
+the Critical Path Method, on tasks.csv and on random task graphs, with and
+without Numba.
+
+Usage: python -m unittest test_cpm
+"""
+
+import importlib
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import cpm
+import cpm_kernels
+
+TASKS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tasks.csv')
+
+# Reference CPM: repeat both passes until nothing changes
+def referenceCPM(mydata):
+    COD = [c.strip() for c in mydata['COD']]
+    DUR = dict(zip(COD, mydata['DUR']))
+    PRE = {}
+    for c, p in zip(COD, mydata['PRE']):
+        PRE[c] = [] if pd.isna(p) else [x.strip() for x in p.split(',') if x.strip()]
+    SUC = {c: [s for s in COD if c in PRE[s]] for c in COD}
+
+    ES = {c: 0 for c in COD}
+    changed = True
+    while changed:
+        changed = False
+        for c in COD:
+            es = max((ES[p] + DUR[p] for p in PRE[c]), default=0)
+            if es != ES[c]:
+                ES[c] = es
+                changed = True
+
+    LF = {c: ES[c] + DUR[c] if not SUC[c] else float('inf') for c in COD}
+    changed = True
+    while changed:
+        changed = False
+        for c in COD:
+            if SUC[c]:
+                lf = min(LF[s] - DUR[s] for s in SUC[c])
+                if lf != LF[c]:
+                    LF[c] = lf
+                    changed = True
+
+    return pd.DataFrame({
+        'ES': [ES[c] for c in COD],
+        'EF': [ES[c] + DUR[c] for c in COD],
+        'LS': [LF[c] - DUR[c] for c in COD],
+        'LF': [LF[c] for c in COD],
+        'SLACK': [LF[c] - DUR[c] - ES[c] for c in COD],
+    })
+
+# Random task graph with rows in shuffled order
+def randomTasks(seed, ntask):
+    rnd = random.Random(seed)
+    COD = [f"T{i}" for i in range(ntask)]
+    PRE = []
+    for i in range(ntask):
+        preds = rnd.sample(range(i), min(i, rnd.randint(0, 3)))
+        PRE.append(','.join(COD[p] for p in preds) if preds else np.nan)
+    rows = list(range(ntask))
+    rnd.shuffle(rows)
+    return pd.DataFrame({
+        'COD': [COD[r] for r in rows],
+        'PRE': [PRE[r] for r in rows],
+        'DUR': [rnd.randint(0, 30) for _ in rows],
+    })
+
+class CPMTest(unittest.TestCase):
+
+    def assertMatchesReference(self, mydata):
+        result = cpm.computeCPM(mydata.copy())
+        expected = referenceCPM(mydata)
+        for column in ['ES', 'EF', 'LS', 'LF', 'SLACK']:
+            np.testing.assert_array_equal(result[column].to_numpy(), expected[column].to_numpy(), err_msg=column)
+
+    def test_tasks_csv(self):
+        mydata = cpm.loadTasks(TASKS_CSV)
+        self.assertMatchesReference(mydata)
+        result = cpm.computeCPM(mydata)
+        self.assertEqual(np.max(result['EF']), 118)
+        self.assertEqual(cpm.critical_path_string(result), 'A -> B -> C -> E -> F -> I -> H')
+
+    def test_schedule_columns_are_int32(self):
+        result = cpm.computeCPM(cpm.loadTasks(TASKS_CSV))
+        for column in ['ES', 'EF', 'LS', 'LF', 'SLACK']:
+            self.assertEqual(result[column].dtype, np.int32)
+        self.assertEqual((result['EF'] * 1440).max(), 118 * 1440)
+
+    def test_row_order_and_index_preserved(self):
+        mydata = randomTasks(3, 30)
+        mydata.index = np.arange(10, 10 * (len(mydata) + 1), 10)
+        result = cpm.computeCPM(mydata.copy())
+        self.assertListEqual(list(result.index), list(mydata.index))
+        self.assertListEqual(list(result['COD']), list(mydata['COD']))
+        expected = referenceCPM(mydata)
+        for column in ['ES', 'EF', 'LS', 'LF', 'SLACK']:
+            np.testing.assert_array_equal(result[column].to_numpy(), expected[column].to_numpy(), err_msg=column)
+
+    def test_random_graphs(self):
+        for seed in range(20):
+            with self.subTest(seed=seed):
+                self.assertMatchesReference(randomTasks(seed, random.Random(seed).randint(1, 80)))
+
+    def test_large_random_graph(self):
+        self.assertMatchesReference(randomTasks(1000, 400))
+
+    def test_batch_matches_reference(self):
+        mydata = randomTasks(7, 60)
+        durations = np.random.default_rng(7).integers(0, 20, size=(5, len(mydata)))
+        batch = cpm.computeBatch(mydata, durations)
+        for b in range(durations.shape[0]):
+            expected = referenceCPM(mydata.assign(DUR=durations[b]))
+            for column, values in zip(['ES', 'EF', 'LS', 'LF', 'SLACK'], batch):
+                np.testing.assert_array_equal(values[b], expected[column].to_numpy(), err_msg=column)
+
+    def test_solver_matches_reference(self):
+        mydata = randomTasks(11, 50)
+        solve = cpm.makeSolver(mydata)
+        rng = np.random.default_rng(11)
+        for _ in range(5):
+            DUR = rng.integers(0, 25, size=len(mydata))
+            sched, SLACK = solve(DUR)
+            expected = referenceCPM(mydata.assign(DUR=DUR))
+            for c, column in enumerate(['ES', 'EF', 'LS', 'LF']):
+                np.testing.assert_array_equal(sched[:, c], expected[column].to_numpy(), err_msg=column)
+            np.testing.assert_array_equal(SLACK, expected['SLACK'].to_numpy())
+
+    def test_compute_many(self):
+        projects = [randomTasks(seed, 20 + seed) for seed in range(3)] + [cpm.loadTasks(TASKS_CSV)]
+        results = cpm.compute_many(projects)
+        self.assertEqual(len(results), len(projects))
+        for mydata, result in zip(projects, results):
+            expected = referenceCPM(mydata)
+            for column in ['ES', 'EF', 'LS', 'LF', 'SLACK']:
+                np.testing.assert_array_equal(result[column].to_numpy(), expected[column].to_numpy(), err_msg=column)
+
+    def test_batch_shape_mismatch_raises(self):
+        mydata = pd.DataFrame({'COD': ['A', 'B'], 'PRE': [np.nan, 'A'], 'DUR': [1, 2]})
+        for durations in (np.ones((1, 3), int), np.ones(2, int), np.ones((1, 1), int)):
+            with self.subTest(shape=durations.shape), self.assertRaises(cpm.CPMError):
+                cpm.computeBatch(mydata, durations)
+
+    def test_invalid_durations_raise(self):
+        for DUR in ([1, -2], [1, np.nan], [1, 2.5], ['1', 'x'], [3_000_000_000, 1]):
+            with self.subTest(DUR=DUR):
+                mydata = pd.DataFrame({'COD': ['A', 'B'], 'PRE': [np.nan, 'A'], 'DUR': DUR})
+                with self.assertRaises(cpm.CPMError):
+                    cpm.computeCPM(mydata)
+        solve = cpm.makeSolver(pd.DataFrame({'COD': ['A', 'B'], 'PRE': [np.nan, 'A'], 'DUR': [1, 2]}))
+        for DUR in ([1, -2], [1.0, 2.5], [True, True], np.array([1, 2], dtype=object), [[1, 2]], [1, 2, 3]):
+            with self.subTest(DUR=DUR), self.assertRaises(cpm.CPMError):
+                solve(np.array(DUR))
+
+    def test_cycle_raises(self):
+        mydata = pd.DataFrame({'COD': ['A', 'B', 'C'], 'PRE': ['C', 'A', 'B'], 'DUR': [1, 2, 3]})
+        with self.assertRaises(cpm.CPMError):
+            cpm.computeCPM(mydata)
+
+    def test_unknown_code_raises(self):
+        mydata = pd.DataFrame({'COD': ['A', 'B'], 'PRE': [np.nan, 'Z'], 'DUR': [1, 2]})
+        with self.assertRaises(cpm.CPMError):
+            cpm.computeCPM(mydata)
+
+    def test_duplicate_code_raises(self):
+        mydata = pd.DataFrame({'COD': ['A', 'A', 'B'], 'PRE': [np.nan, np.nan, 'A'], 'DUR': [5, 1, 2]})
+        with self.assertRaises(cpm.CPMError):
+            cpm.computeCPM(mydata)
+
+@unittest.skipUnless(cpm_kernels.HAVE_COMPILED, "no compiled kernels to hide")
+class CPMWithoutNumbaTest(CPMTest):
+
+    # Reload the kernels as if neither Numba nor the AOT build were installed
+    @classmethod
+    def setUpClass(cls):
+        cls._saved = {name: sys.modules.get(name) for name in ('numba', 'cpm_kernels_aot')}
+        sys.modules['numba'] = None
+        sys.modules['cpm_kernels_aot'] = None
+        importlib.reload(cpm_kernels)
+        assert not cpm_kernels.HAVE_COMPILED
+
+    @classmethod
+    def tearDownClass(cls):
+        for name, module in cls._saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        importlib.reload(cpm_kernels)
+
+if __name__ == "__main__":
+    unittest.main()